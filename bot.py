@@ -1,19 +1,24 @@
 #!/usr/bin/env python3
+import heapq
+import itertools
 import logging
-import queue
+import re
 import signal
 import sys
 import threading
 import time
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed, wait
 from dataclasses import dataclass, field
 from pathlib import Path
+from typing import Optional
 
 from dotenv import load_dotenv
+from praw.models import Comment
 
 sys.path.insert(0, str(Path(__file__).resolve().parent / "src"))
 
 from config import load_settings
-from detector import AiDetector
+from detector import AiDetector, DetectionResult, confidence_band
 from reddit_client import RateLimitedReddit
 from storage import Storage
 
@@ -23,8 +28,17 @@ logging.basicConfig(
 )
 LOGGER = logging.getLogger("isthisai")
 
+MAX_BATCH = 8
+FETCH_WORKERS = 8
+BATCH_WAIT_SECONDS = 0.25
+SHUTDOWN_GRACE_SECONDS = 30
+CATCH_UP_PAGE_SIZE = 100
+CATCH_UP_MAX_PAGES = 10
+CHECKPOINT_EVERY_COMMENTS = 500
+CHECKPOINT_EVERY_SECONDS = 10.0
 
-@dataclass(order=True)
+
+@dataclass(order=True, slots=True)
 class QueueJob:
     priority: int
     sequence: int
@@ -32,12 +46,27 @@ class QueueJob:
     payload: dict = field(compare=False, default_factory=dict)
 
 
+@dataclass(frozen=True, slots=True)
+class FetchContext:
+    comment_id: str
+    comment: Comment
+    text: str
+
+
 class Bot:
     def __init__(self):
         load_dotenv()
         self.settings = load_settings()
         self.storage = Storage(self.settings.db_path)
-        self.detector = AiDetector(self.settings.model_name)
+        purged = self.storage.purge_detections(self.settings.detection_ttl_days)
+        if purged:
+            LOGGER.info("Purged %s expired cached detections", purged)
+        self.detector = AiDetector(
+            self.settings.detector.model_name,
+            cache_dir=self.settings.detector.onnx_cache_dir,
+            num_threads=self.settings.detector.inference_threads,
+            store=self.storage,
+        )
         self.reddit = RateLimitedReddit(
             client_id=self.settings.reddit_client_id,
             client_secret=self.settings.reddit_client_secret,
@@ -47,99 +76,200 @@ class Bot:
             calls_per_minute=self.settings.api_calls_per_minute,
         )
 
-        self.jobs: queue.PriorityQueue[QueueJob] = queue.PriorityQueue()
+        self._heap: list[QueueJob] = []
+        self._jobs_cv = threading.Condition()
         self.stop_event = threading.Event()
-        self.poll_in_progress = threading.Event()
-        self._seq = 0
-        self._seq_lock = threading.Lock()
+        self._trigger_re = re.compile(re.escape(self.settings.command_trigger), re.IGNORECASE)
+        self._seq = itertools.count(1)
+        self._fetch_pool = ThreadPoolExecutor(max_workers=FETCH_WORKERS, thread_name_prefix="fetch")
 
     def _next_seq(self) -> int:
-        with self._seq_lock:
-            self._seq += 1
-            return self._seq
-
-    def enqueue_poll(self) -> None:
-        self.jobs.put(QueueJob(priority=1, sequence=self._next_seq(), kind="poll"))
-
-    def enqueue_fetch_reply(self, comment_id: str) -> None:
-        self.jobs.put(
+        return next(self._seq)
+
+    def _push_job(self, job: QueueJob) -> None:
+        with self._jobs_cv:
+            heapq.heappush(self._heap, job)
+            self._jobs_cv.notify()
+
+    def _take_jobs(self, max_jobs: int, timeout: float, linger: float) -> list[QueueJob]:
+        with self._jobs_cv:
+            if not self._jobs_cv.wait_for(lambda: self._heap, timeout):
+                return []
+            deadline = time.monotonic() + linger
+            while len(self._heap) < max_jobs and not self.stop_event.is_set():
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._jobs_cv.wait(remaining)
+            batch: list[QueueJob] = []
+            while self._heap and len(batch) < max_jobs:
+                batch.append(heapq.heappop(self._heap))
+            return batch
+
+    def enqueue_fetch_reply(self, comment_id: str, link_id: Optional[str] = None) -> None:
+        self._push_job(
             QueueJob(
                 priority=2,
                 sequence=self._next_seq(),
                 kind="fetch_and_reply",
-                payload={"comment_id": comment_id},
+                payload={"comment_id": comment_id, "link_id": link_id},
             )
         )
 
-    def scheduler_loop(self) -> None:
+    def stream_loop(self) -> None:
         while not self.stop_event.is_set():
-            if not self.poll_in_progress.is_set():
-                self.poll_in_progress.set()
-                self.enqueue_poll()
-            self.stop_event.wait(self.settings.poll_interval_seconds)
+            try:
+                # The stream skips comments that existed when it connects, so catch up
+                # from the checkpoint first, on every connect.
+                self.catch_up()
+                self._consume_stream()
+            except Exception:
+                LOGGER.exception("Comment stream failed; reconnecting")
+                self.stop_event.wait(self.settings.stream_retry_seconds)
+
+    def _consume_stream(self) -> None:
+        newest: Optional[str] = None
+        unsaved = 0
+        last_saved = time.monotonic()
+        try:
+            for comment in self.reddit.stream_comments():
+                if self.stop_event.is_set():
+                    return
+                if comment is not None:
+                    newest = comment.fullname
+                    unsaved += 1
+                    self._consider(comment)
+                if newest is None:
+                    continue
+                now = time.monotonic()
+                if (
+                    comment is None
+                    or unsaved >= CHECKPOINT_EVERY_COMMENTS
+                    or now - last_saved >= CHECKPOINT_EVERY_SECONDS
+                ):
+                    self.storage.set_last_seen_id(newest)
+                    newest = None
+                    unsaved = 0
+                    last_saved = now
+        finally:
+            if newest is not None:
+                self.storage.set_last_seen_id(newest)
+
+    def catch_up(self) -> None:
+        cursor = self.storage.get_last_seen_id()
+        if cursor is None:
+            return
+        for _ in range(CATCH_UP_MAX_PAGES):
+            # before= walks toward newer comments; each page is still newest-first.
+            comments = self.reddit.get_comments(limit=CATCH_UP_PAGE_SIZE, before=cursor)
+            if not comments:
+                return
+            for comment in reversed(comments):
+                self._consider(comment)
+            cursor = comments[0].fullname
+            self.storage.set_last_seen_id(cursor)
+            if len(comments) < CATCH_UP_PAGE_SIZE:
+                return
+
+    def _consider(self, comment: Comment) -> None:
+        if self._trigger_re.search(comment.body) is None:
+            return
+        if self.storage.has_replied(comment.id):
+            return
+        self.enqueue_fetch_reply(comment.id, comment.link_id)
 
     def worker_loop(self) -> None:
         while not self.stop_event.is_set():
-            try:
-                job = self.jobs.get(timeout=0.5)
-            except queue.Empty:
+            batch = self._take_jobs(MAX_BATCH, timeout=0.5, linger=BATCH_WAIT_SECONDS)
+            targets = [
+                (job.payload["comment_id"], job.payload.get("link_id"))
+                for job in batch
+                if job.kind == "fetch_and_reply"
+            ]
+            if not targets:
                 continue
-
             try:
-                if job.kind == "poll":
-                    self.handle_poll_job()
-                elif job.kind == "fetch_and_reply":
-                    self.handle_fetch_and_reply(job.payload["comment_id"])
+                self.handle_fetch_and_reply_batch(targets)
             except Exception:
-                LOGGER.exception("Unhandled error while processing %s", job.kind)
-                if job.kind == "poll":
-                    self.poll_in_progress.clear()
-            finally:
-                self.jobs.task_done()
-
-    def handle_poll_job(self) -> None:
-        last_seen = self.storage.get_last_seen_id()
-        comments = self.reddit.get_comments(limit=100, after=last_seen)
-
-        if not comments:
-            self.poll_in_progress.clear()
-            return
+                LOGGER.exception("Unhandled error while processing fetch_and_reply batch")
 
-        # Persist newest seen comment id immediately to minimize restart gaps.
-        self.storage.set_last_seen_id(comments[0].fullname)
-
-        for comment in reversed(comments):
-            if self.settings.command_trigger in comment.body.lower():
-                if self.storage.has_replied(comment.id):
-                    continue
-                self.enqueue_fetch_reply(comment.id)
-
-        if len(comments) == 100:
-            self.enqueue_poll()
-        else:
-            self.poll_in_progress.clear()
-
-    def handle_fetch_and_reply(self, comment_id: str) -> None:
-        if self.storage.has_replied(comment_id):
+    def handle_fetch_and_reply_batch(self, targets: list[tuple[str, Optional[str]]]) -> None:
+        link_ids = dict(targets)
+        pending = [cid for cid in link_ids if not self.storage.has_replied(cid)]
+        if not pending:
             return
 
-        comment = self.reddit.fetch_comment(comment_id)
-        submission = self.reddit.fetch_parent_submission(comment)
-        text = (submission.selftext or "").strip()
-
-        if not text:
-            body = (
-                "🤖 **AI Analysis:** I can only analyze text posts with body content.\n\n"
-                "*Note: AI detection is never definitive.*"
+        futures = [
+            self._fetch_pool.submit(self.fetch_context, cid, link_ids.get(cid)) for cid in pending
+        ]
+        replies: list[Future] = []
+        try:
+            ids: list[str] = []
+            comments: list[Comment] = []
+            texts: list[str] = []
+            for future in as_completed(futures):
+                context = future.result()
+                if context is None:
+                    continue
+                words = len(context.text.split())
+                body = None
+                if not context.text:
+                    body = (
+                        "🤖 **AI Analysis:** I can only analyze text posts with body content.\n\n"
+                        "*Note: AI detection is never definitive.*"
+                    )
+                elif words < self.settings.min_words_infer:
+                    body = (
+                        f"🤖 **AI Analysis:** this post is only {words} words, "
+                        "which is too short to analyze reliably.\n\n"
+                        "*Note: AI detection is never definitive.*"
+                    )
+                if body is not None:
+                    replies.append(
+                        self._fetch_pool.submit(
+                            self._reply, context.comment_id, context.comment, body
+                        )
+                    )
+                    continue
+                ids.append(context.comment_id)
+                comments.append(context.comment)
+                texts.append(context.text)
+
+            results = self.detector.detect_batch(texts)
+            for comment_id, comment, text, result in zip(ids, comments, texts, results):
+                body = self._format_reply(text, result)
+                replies.append(self._fetch_pool.submit(self._reply, comment_id, comment, body))
+        finally:
+            # Record whatever was posted even if detection or a later step failed.
+            wait(replies)
+            self.storage.mark_replied_many(
+                future.result() for future in replies if future.result() is not None
             )
+
+    def fetch_context(
+        self, comment_id: str, link_id: Optional[str] = None
+    ) -> Optional[FetchContext]:
+        try:
+            comment = self.reddit.fetch_comment(comment_id)
+            submission = self.reddit.fetch_parent_submission(comment, link_id)
+            text = (submission.selftext or "").strip() if submission.is_self else ""
+        except Exception:
+            LOGGER.exception("Failed to fetch context for comment %s", comment_id)
+            return None
+        return FetchContext(comment_id=comment_id, comment=comment, text=text)
+
+    def _reply(self, comment_id: str, comment: Comment, body: str) -> Optional[str]:
+        try:
             self.reddit.post_reply(comment, body)
-            self.storage.mark_replied(comment_id)
-            return
+        except Exception:
+            LOGGER.exception("Failed to reply to comment %s", comment_id)
+            return None
+        return comment_id
 
+    def _format_reply(self, text: str, result: DetectionResult) -> str:
         words = len(text.split())
-        result = self.detector.detect(text)
         pct = int(round(result.probability_ai * 100))
-        confidence = self._confidence_band(result.probability_ai)
+        confidence = confidence_band(result.probability_ai)
 
         warning = ""
         if words < self.settings.min_words_warning:
@@ -148,7 +278,7 @@ class Bot:
                 "so detector accuracy may be lower."
             )
 
-        body = (
+        return (
             f"🤖 **AI Analysis:** {pct}% likely AI-generated "
             f"*(confidence: {confidence} - post is {words} words)*\n"
             f"Signal: classifier score {result.probability_ai:.2f}\n\n"
@@ -156,21 +286,10 @@ class Bot:
             f"{warning}"
         )
 
-        self.reddit.post_reply(comment, body)
-        self.storage.mark_replied(comment_id)
-
-    @staticmethod
-    def _confidence_band(score: float) -> str:
-        if score >= 0.8 or score <= 0.2:
-            return "high"
-        if score >= 0.65 or score <= 0.35:
-            return "medium"
-        return "low"
-
     def run(self) -> None:
-        scheduler = threading.Thread(target=self.scheduler_loop, name="scheduler", daemon=True)
+        streamer = threading.Thread(target=self.stream_loop, name="stream", daemon=True)
         worker = threading.Thread(target=self.worker_loop, name="worker", daemon=True)
-        scheduler.start()
+        streamer.start()
         worker.start()
 
         def _shutdown(signum, _frame):
@@ -183,8 +302,15 @@ class Bot:
         while not self.stop_event.is_set():
             time.sleep(0.5)
 
-        scheduler.join(timeout=2)
-        worker.join(timeout=2)
+        streamer.join(timeout=2)
+        worker.join(timeout=SHUTDOWN_GRACE_SECONDS)
+        self._fetch_pool.shutdown(wait=False)
+        if worker.is_alive() or streamer.is_alive():
+            LOGGER.warning(
+                "Threads still busy after %ss; leaving storage open", SHUTDOWN_GRACE_SECONDS
+            )
+        else:
+            self.storage.close()
 
 
 if __name__ == "__main__":
@@ -1,6 +1,5 @@
 #!/usr/bin/env python3
 import argparse
-import os
 import sys
 from pathlib import Path
 
@@ -8,18 +7,8 @@ from dotenv import load_dotenv
 
 sys.path.insert(0, str(Path(__file__).resolve().parent / "src"))
 
-from detector import AiDetector
-
-
-DEFAULT_MODEL_NAME = "ShantanuT01/BERT-tiny-RAID"
-
-
-def confidence_band(score: float) -> str:
-    if score >= 0.8 or score <= 0.2:
-        return "high"
-    if score >= 0.65 or score <= 0.35:
-        return "medium"
-    return "low"
+from config import DEFAULT_MODEL_NAME, load_detector_settings
+from detector import AiDetector, confidence_band
 
 
 def parse_args() -> argparse.Namespace:
@@ -92,8 +81,12 @@ def main() -> int:
         print("Choose only one input mode: positional text, --file, --stdin, or --interactive.")
         return 2
 
-    model_name = args.model or os.getenv("MODEL_NAME", DEFAULT_MODEL_NAME)
-    detector = AiDetector(model_name)
+    settings = load_detector_settings()
+    detector = AiDetector(
+        args.model or settings.model_name,
+        cache_dir=settings.onnx_cache_dir,
+        num_threads=settings.inference_threads,
+    )
 
     if args.interactive:
         return _run_interactive(detector)
@@ -1,6 +1,15 @@
 import os
 from dataclasses import dataclass
 
+DEFAULT_MODEL_NAME = "ShantanuT01/BERT-tiny-RAID"
+
+
+@dataclass(frozen=True)
+class DetectorSettings:
+    model_name: str
+    onnx_cache_dir: str
+    inference_threads: int
+
 
 @dataclass(frozen=True)
 class Settings:
@@ -9,12 +18,14 @@ class Settings:
     reddit_username: str
     reddit_password: str
     reddit_user_agent: str
-    poll_interval_seconds: float
+    stream_retry_seconds: float
     db_path: str
-    model_name: str
+    detector: DetectorSettings
     api_calls_per_minute: int
     command_trigger: str
     min_words_warning: int
+    min_words_infer: int
+    detection_ttl_days: float
 
 
 
@@ -26,6 +37,15 @@ def _required(name: str) -> str:
 
 
 
+def load_detector_settings() -> DetectorSettings:
+    return DetectorSettings(
+        model_name=os.getenv("MODEL_NAME", DEFAULT_MODEL_NAME),
+        onnx_cache_dir=os.getenv("ONNX_CACHE_DIR", "./onnx_models"),
+        inference_threads=int(os.getenv("INFERENCE_THREADS", "2")),
+    )
+
+
+
 def load_settings() -> Settings:
     return Settings(
         reddit_client_id=_required("REDDIT_CLIENT_ID"),
@@ -33,10 +53,12 @@ def load_settings() -> Settings:
         reddit_username=_required("REDDIT_USERNAME"),
         reddit_password=_required("REDDIT_PASSWORD"),
         reddit_user_agent=_required("REDDIT_USER_AGENT"),
-        poll_interval_seconds=float(os.getenv("POLL_INTERVAL_SECONDS", "5")),
+        stream_retry_seconds=float(os.getenv("STREAM_RETRY_SECONDS", "5")),
         db_path=os.getenv("DB_PATH", "./bot_state.db"),
-        model_name=os.getenv("MODEL_NAME", "ShantanuT01/BERT-tiny-RAID"),
+        detector=load_detector_settings(),
         api_calls_per_minute=int(os.getenv("API_CALLS_PER_MINUTE", "90")),
         command_trigger=os.getenv("COMMAND_TRIGGER", "!isthisai").strip().lower(),
         min_words_warning=int(os.getenv("MIN_WORDS_WARNING", "150")),
+        min_words_infer=int(os.getenv("MIN_WORDS_INFER", "20")),
+        detection_ttl_days=float(os.getenv("DETECTION_TTL_DAYS", "30")),
     )
@@ -1,6 +1,19 @@
+import hashlib
+import os
+import threading
+from collections import OrderedDict
 from dataclasses import dataclass
+from pathlib import Path
+from typing import Iterable, Optional, Protocol
 
-from transformers import pipeline
+import numpy as np
+import onnxruntime as ort
+from optimum.onnxruntime import ORTModelForSequenceClassification, ORTQuantizer
+from optimum.onnxruntime.configuration import AutoQuantizationConfig
+from transformers import AutoTokenizer
+
+QUANTIZED_FILE_NAME = "model_quantized.onnx"
+CACHE_MAXSIZE = 1024
 
 
 @dataclass(frozen=True)
@@ -9,11 +22,94 @@ class DetectionResult:
     label: str
 
 
+class DetectionStore(Protocol):
+    def get_detection(self, text_hash: bytes) -> Optional[tuple[float, str]]: ...
+
+    def put_detections(self, rows: Iterable[tuple[bytes, float, str]]) -> None: ...
+
+
+def confidence_band(score: float) -> str:
+    distance = abs(score - 0.5)
+    if distance >= 0.3:
+        return "high"
+    if distance >= 0.15:
+        return "medium"
+    return "low"
+
+
+def text_digest(text: str, model_key: bytes = b"") -> bytes:
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=16, key=model_key).digest()
+
+
+def _model_key(model_name: str, model_path: Path) -> bytes:
+    # Durable cache rows must not outlive a model swap or a rebuilt quantized file.
+    digest = hashlib.blake2b(model_name.encode("utf-8") + b"\0", digest_size=16)
+    with model_path.open("rb") as handle:
+        for chunk in iter(lambda: handle.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.digest()
+
+
+def _model_dir(model_name: str, cache_dir: str) -> Path:
+    return Path(cache_dir) / model_name.replace("/", "__")
+
+
+def _session_options(num_threads: int) -> ort.SessionOptions:
+    options = ort.SessionOptions()
+    options.intra_op_num_threads = max(1, min(num_threads, os.cpu_count() or 1))
+    options.inter_op_num_threads = 1
+    options.execution_mode = ort.ExecutionMode.ORT_SEQUENTIAL
+    options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+    return options
+
+
+def _load_quantized_model(
+    model_name: str, cache_dir: str, num_threads: int
+) -> ORTModelForSequenceClassification:
+    save_dir = _model_dir(model_name, cache_dir)
+    if not (save_dir / QUANTIZED_FILE_NAME).exists():
+        # One-time ONNX export + dynamic int8 quantization; later startups reuse the file.
+        exported = ORTModelForSequenceClassification.from_pretrained(
+            model_name, export=True, provider="CPUExecutionProvider"
+        )
+        ORTQuantizer.from_pretrained(exported).quantize(
+            save_dir=save_dir,
+            quantization_config=AutoQuantizationConfig.avx512_vnni(is_static=False, per_channel=False),
+        )
+    return ORTModelForSequenceClassification.from_pretrained(
+        save_dir,
+        file_name=QUANTIZED_FILE_NAME,
+        provider="CPUExecutionProvider",
+        session_options=_session_options(num_threads),
+    )
+
+
+def _softmax(logits: np.ndarray) -> np.ndarray:
+    shifted = np.exp(logits - logits.max(axis=-1, keepdims=True))
+    return shifted / shifted.sum(axis=-1, keepdims=True)
+
+
 class AiDetector:
-    def __init__(self, model_name: str):
-        self._classifier = pipeline("text-classification", model=model_name, tokenizer=model_name)
-        raw_id2label = getattr(getattr(self._classifier, "model", None), "config", None)
-        raw_id2label = getattr(raw_id2label, "id2label", {}) or {}
+    def __init__(
+        self,
+        model_name: str,
+        *,
+        cache_dir: str,
+        num_threads: int,
+        store: Optional[DetectionStore] = None,
+    ):
+        self._store = store
+        self._tokenizer = AutoTokenizer.from_pretrained(model_name)
+        self._model = _load_quantized_model(model_name, cache_dir, num_threads)
+        self._model_key = _model_key(
+            model_name, _model_dir(model_name, cache_dir) / QUANTIZED_FILE_NAME
+        )
+        self._session = self._model.model
+        self._input_names = list(self._model.input_names)
+        self._max_len = min(512, getattr(self._model.config, "max_position_embeddings", 512))
+        self._cache: OrderedDict[bytes, DetectionResult] = OrderedDict()
+        self._cache_lock = threading.Lock()
+        raw_id2label = getattr(self._model.config, "id2label", {}) or {}
         self._id2label: dict[int, str] = {}
         for key, value in raw_id2label.items():
             try:
@@ -22,48 +118,101 @@ class AiDetector:
                 continue
             self._id2label[idx] = str(value).lower()
 
-    def _semantic_label(self, label: str) -> str:
-        lowered = label.lower()
-        if lowered.startswith("label_"):
-            try:
-                idx = int(lowered.split("_", 1)[1])
-            except (IndexError, ValueError):
-                return lowered
-            mapped = self._id2label.get(idx)
-            if mapped:
-                return mapped
-        return lowered
+        self._ai_idx: Optional[int] = None
+        self._human_idx: Optional[int] = None
+        for idx, semantic in sorted(self._id2label.items()):
+            if "human" in semantic:
+                self._human_idx = idx
+            elif "ai" in semantic or "machine" in semantic or "generated" in semantic:
+                self._ai_idx = idx
 
     def detect(self, text: str) -> DetectionResult:
-        # Truncate long posts for model limits while preserving practical performance.
-        results = self._classifier(text, truncation=True, max_length=512, top_k=None)
-        if not isinstance(results, list) or not results:
-            raise RuntimeError("Detector returned no classification results")
+        return self.detect_batch([text])[0]
 
-        top = max(results, key=lambda item: float(item["score"]))
-        top_label = str(top["label"]).lower()
-        top_score = float(top["score"])
+    def detect_batch(self, texts: list[str]) -> list[DetectionResult]:
+        if not texts:
+            return []
+        keys = [text_digest(text, self._model_key) for text in texts]
+        results: list[Optional[DetectionResult]] = [self._cache_get(key) for key in keys]
 
-        ai_score = None
-        human_score = None
-        for item in results:
-            raw_label = str(item["label"])
-            semantic = self._semantic_label(raw_label)
-            score = float(item["score"])
-            if "human" in semantic:
-                human_score = score
-            elif "ai" in semantic or "machine" in semantic or "generated" in semantic:
-                ai_score = score
+        misses: dict[bytes, list[int]] = {}
+        for idx, (key, result) in enumerate(zip(keys, results)):
+            if result is None:
+                misses.setdefault(key, []).append(idx)
 
-        if ai_score is not None:
-            probability_ai = ai_score
-        elif human_score is not None:
-            probability_ai = 1.0 - human_score
+        if misses and self._store is not None:
+            for key in list(misses):
+                stored = self._store.get_detection(key)
+                if stored is None:
+                    continue
+                result = DetectionResult(*stored)
+                self._cache_put(key, result)
+                for idx in misses.pop(key):
+                    results[idx] = result
+
+        if misses:
+            miss_texts = [texts[indices[0]] for indices in misses.values()]
+            detected = self._classify(miss_texts)
+            for (key, indices), result in zip(misses.items(), detected):
+                self._cache_put(key, result)
+                for idx in indices:
+                    results[idx] = result
+            if self._store is not None:
+                self._store.put_detections(
+                    (key, result.probability_ai, result.label)
+                    for key, result in zip(misses, detected)
+                )
+        return results
+
+    def _cache_get(self, key: bytes) -> Optional[DetectionResult]:
+        with self._cache_lock:
+            result = self._cache.get(key)
+            if result is not None:
+                self._cache.move_to_end(key)
+            return result
+
+    def _cache_put(self, key: bytes, result: DetectionResult) -> None:
+        with self._cache_lock:
+            self._cache[key] = result
+            self._cache.move_to_end(key)
+            if len(self._cache) > CACHE_MAXSIZE:
+                self._cache.popitem(last=False)
+
+    def _infer(self, texts: list[str]) -> np.ndarray:
+        inputs = self._tokenizer(
+            texts,
+            truncation=True,
+            max_length=self._max_len,
+            padding="longest" if len(texts) > 1 else False,
+            return_tensors="np",
+        )
+        input_ids = inputs["input_ids"]
+        feed = {
+            name: inputs[name] if name in inputs else np.zeros_like(input_ids)
+            for name in self._input_names
+        }
+        (logits,) = self._session.run(["logits"], feed)
+        return _softmax(logits.astype(np.float32, copy=False))
+
+    def _classify(self, texts: list[str]) -> list[DetectionResult]:
+        probs = self._infer(texts)
+        if probs.ndim != 2 or probs.shape[0] != len(texts) or probs.shape[1] == 0:
+            raise RuntimeError("Detector returned no classification results")
+
+        top_idx = probs.argmax(axis=1)
+        if self._ai_idx is not None:
+            probability_ai = probs[:, self._ai_idx]
+        elif self._human_idx is not None:
+            probability_ai = 1.0 - probs[:, self._human_idx]
         else:
             # Fallback for unknown label conventions.
-            probability_ai = top_score
+            probability_ai = probs.max(axis=1)
+        probability_ai = np.clip(probability_ai, 0.0, 1.0)
 
-        return DetectionResult(
-            probability_ai=max(0.0, min(1.0, probability_ai)),
-            label=self._semantic_label(top_label),
-        )
+        return [
+            DetectionResult(
+                probability_ai=float(score),
+                label=self._id2label.get(int(idx), f"label_{int(idx)}"),
+            )
+            for score, idx in zip(probability_ai, top_idx)
+        ]
@@ -1,13 +1,39 @@
 import logging
 import threading
 import time
-from typing import Optional
+from typing import Iterator, Optional
 
+import orjson
 import praw
+import requests
 from praw.models import Comment, Submission
+from praw.models.util import stream_generator
+from requests.adapters import HTTPAdapter
 
 LOGGER = logging.getLogger(__name__)
 
+RATELIMIT_RESERVE = 5
+HTTP_POOL_SIZE = 16
+
+
+class _OrjsonResponse(requests.Response):
+    def json(self):
+        return orjson.loads(self.content)
+
+
+class _OrjsonSession(requests.Session):
+    def send(self, request: requests.PreparedRequest, **kwargs) -> requests.Response:
+        response = super().send(request, **kwargs)
+        response.__class__ = _OrjsonResponse
+        return response
+
+
+def _build_session() -> requests.Session:
+    session = _OrjsonSession()
+    adapter = HTTPAdapter(pool_connections=HTTP_POOL_SIZE, pool_maxsize=HTTP_POOL_SIZE)
+    session.mount("https://", adapter)
+    return session
+
 
 class TokenBucket:
     def __init__(self, capacity: int, refill_per_second: float):
@@ -18,15 +44,13 @@ class TokenBucket:
         self._lock = threading.Lock()
 
     def consume(self, amount: float = 1.0) -> None:
-        while True:
-            with self._lock:
-                self._refill()
-                if self._tokens >= amount:
-                    self._tokens -= amount
-                    return
-                missing = amount - self._tokens
-                wait_seconds = missing / self._refill_per_second
-            time.sleep(max(wait_seconds, 0.01))
+        with self._lock:
+            self._refill()
+            # Debit up front, possibly going negative, to reserve this caller's slot.
+            self._tokens -= amount
+            wait_seconds = -self._tokens / self._refill_per_second
+        if wait_seconds > 0:
+            time.sleep(wait_seconds)
 
     def _refill(self) -> None:
         now = time.monotonic()
@@ -53,25 +77,67 @@ class RateLimitedReddit:
             username=username,
             password=password,
             user_agent=user_agent,
+            requestor_kwargs={"session": _build_session()},
         )
         self._bucket = TokenBucket(capacity=calls_per_minute, refill_per_second=calls_per_minute / 60.0)
+        # PRAW isn't thread-safe, so every request from the stream and fetch threads
+        # goes through this lock; token waits happen outside it.
+        self._api_lock = threading.Lock()
 
-    def get_comments(self, *, limit: int = 100, after: Optional[str] = None) -> list[Comment]:
+    def _acquire(self) -> None:
         self._bucket.consume()
-        params = {"after": after} if after else None
-        comments = list(self._reddit.subreddit("all").comments(limit=limit, params=params))
-        LOGGER.debug("Fetched %s comments (after=%s)", len(comments), after)
+        with self._api_lock:
+            limits = self._reddit.auth.limits
+        remaining = limits.get("remaining")
+        reset_timestamp = limits.get("reset_timestamp")
+        if remaining is None or reset_timestamp is None or remaining >= RATELIMIT_RESERVE:
+            return
+        wait_seconds = reset_timestamp - time.time()
+        if wait_seconds > 0:
+            LOGGER.warning(
+                "Reddit rate limit nearly exhausted (%s left); sleeping %.1fs until reset",
+                remaining,
+                wait_seconds,
+            )
+            time.sleep(wait_seconds)
+
+    def get_comments(self, *, limit: int = 100, before: Optional[str] = None) -> list[Comment]:
+        self._acquire()
+        params = {"before": before} if before else None
+        with self._api_lock:
+            comments = list(self._reddit.subreddit("all").comments(limit=limit, params=params))
+        LOGGER.debug("Fetched %s comments (before=%s)", len(comments), before)
         return comments
 
-    def fetch_parent_submission(self, comment: Comment) -> Submission:
-        self._bucket.consume()
-        comment.refresh()
-        return comment.submission
+    def stream_comments(self) -> Iterator[Optional[Comment]]:
+        subreddit = self._reddit.subreddit("all")
+
+        def _listing(**kwargs):
+            self._acquire()
+            with self._api_lock:
+                return list(subreddit.comments(**kwargs))
+
+        # pause_after=0 yields None after each request with nothing new.
+        return stream_generator(_listing, pause_after=0, skip_existing=True)
+
+    def fetch_parent_submission(self, comment: Comment, link_id: Optional[str] = None) -> Submission:
+        if link_id is None:
+            # Reading link_id off a lazy comment fetches it; that request costs a token too.
+            self._acquire()
+            with self._api_lock:
+                link_id = comment.link_id
+        self._acquire()
+        # Reading selftext performs the single submission fetch.
+        with self._api_lock:
+            submission = self._reddit.submission(id=link_id.split("_", 1)[1])
+            _ = submission.selftext
+        return submission
 
     def fetch_comment(self, comment_id: str) -> Comment:
-        self._bucket.consume()
+        # Lazy: no request is made until an attribute is read, so no token is taken here.
         return self._reddit.comment(comment_id)
 
     def post_reply(self, comment: Comment, body: str) -> None:
-        self._bucket.consume()
-        comment.reply(body)
+        self._acquire()
+        with self._api_lock:
+            comment.reply(body)
@@ -1,20 +1,24 @@
 import sqlite3
 from threading import Lock
-from typing import Optional
+from typing import Iterable, Optional
 
 
 class Storage:
     def __init__(self, db_path: str):
-        self._db_path = db_path
-        self._lock = Lock()
+        self._write_lock = Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("PRAGMA temp_store=MEMORY")
         self._init_db()
-
-    def _connect(self) -> sqlite3.Connection:
-        return sqlite3.connect(self._db_path)
+        # This process is the only writer, so the set mirrors replied_ids exactly.
+        self._replied_cache: set[str] = {
+            row[0] for row in self._conn.execute("SELECT comment_id FROM replied_ids")
+        }
 
     def _init_db(self) -> None:
-        with self._connect() as conn:
-            conn.execute(
+        with self._write_lock:
+            self._conn.execute(
                 """
                 CREATE TABLE IF NOT EXISTS state (
                     key TEXT PRIMARY KEY,
@@ -22,7 +26,7 @@ class Storage:
                 )
                 """
             )
-            conn.execute(
+            self._conn.execute(
                 """
                 CREATE TABLE IF NOT EXISTS replied_ids (
                     comment_id TEXT PRIMARY KEY,
@@ -30,38 +34,93 @@ class Storage:
                 )
                 """
             )
-            conn.commit()
+            self._conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS detections (
+                    text_hash BLOB PRIMARY KEY,
+                    probability_ai REAL NOT NULL,
+                    label TEXT NOT NULL,
+                    created_at DATETIME DEFAULT CURRENT_TIMESTAMP
+                )
+                """
+            )
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_detections_created_at ON detections(created_at)"
+            )
+
+    def close(self) -> None:
+        with self._write_lock:
+            self._conn.close()
 
     def get_last_seen_id(self) -> Optional[str]:
-        with self._lock, self._connect() as conn:
-            row = conn.execute(
-                "SELECT value FROM state WHERE key = 'last_seen_id'"
-            ).fetchone()
-            return row[0] if row else None
+        row = self._conn.execute(
+            "SELECT value FROM state WHERE key = 'last_seen_id'"
+        ).fetchone()
+        return row[0] if row else None
 
     def set_last_seen_id(self, fullname: str) -> None:
-        with self._lock, self._connect() as conn:
-            conn.execute(
+        with self._write_lock:
+            self._conn.execute(
                 """
                 INSERT INTO state(key, value) VALUES('last_seen_id', ?)
                 ON CONFLICT(key) DO UPDATE SET value = excluded.value
                 """,
                 (fullname,),
             )
-            conn.commit()
 
     def has_replied(self, comment_id: str) -> bool:
-        with self._lock, self._connect() as conn:
-            row = conn.execute(
-                "SELECT 1 FROM replied_ids WHERE comment_id = ?",
-                (comment_id,),
-            ).fetchone()
-            return row is not None
+        return comment_id in self._replied_cache
+
+    def mark_replied_many(self, comment_ids: Iterable[str]) -> None:
+        rows = [(comment_id,) for comment_id in comment_ids]
+        if not rows:
+            return
+        with self._write_lock:
+            # Autocommit connection: open one explicit transaction for the whole batch.
+            self._conn.execute("BEGIN")
+            try:
+                self._conn.executemany(
+                    "INSERT OR IGNORE INTO replied_ids(comment_id) VALUES(?)", rows
+                )
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._conn.execute("COMMIT")
+            self._replied_cache.update(row[0] for row in rows)
+
+    def get_detection(self, text_hash: bytes) -> Optional[tuple[float, str]]:
+        row = self._conn.execute(
+            "SELECT probability_ai, label FROM detections WHERE text_hash = ?",
+            (text_hash,),
+        ).fetchone()
+        return (row[0], row[1]) if row else None
+
+    def put_detections(self, rows: Iterable[tuple[bytes, float, str]]) -> None:
+        rows = list(rows)
+        if not rows:
+            return
+        with self._write_lock:
+            self._conn.execute("BEGIN")
+            try:
+                self._conn.executemany(
+                    """
+                    INSERT INTO detections(text_hash, probability_ai, label) VALUES(?, ?, ?)
+                    ON CONFLICT(text_hash) DO UPDATE SET
+                        probability_ai = excluded.probability_ai,
+                        label = excluded.label,
+                        created_at = CURRENT_TIMESTAMP
+                    """,
+                    rows,
+                )
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._conn.execute("COMMIT")
 
-    def mark_replied(self, comment_id: str) -> None:
-        with self._lock, self._connect() as conn:
-            conn.execute(
-                "INSERT OR IGNORE INTO replied_ids(comment_id) VALUES(?)",
-                (comment_id,),
+    def purge_detections(self, ttl_days: float) -> int:
+        with self._write_lock:
+            cursor = self._conn.execute(
+                "DELETE FROM detections WHERE created_at < datetime('now', ?)",
+                (f"-{ttl_days} days",),
             )
-            conn.commit()
+            return cursor.rowcount